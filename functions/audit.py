@@ -0,0 +1,174 @@
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import warnings
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from functions.common import Detection
+
+AUDIT_KEY_ENV = "MANIS_AUDIT_KEY"
+HASH_SCHEME = "hmac-sha256"
+
+
+def resolve_audit_key(key: Optional[str] = None) -> bytes:
+    """
+    The HMAC key for audit hashes: key if given, else $MANIS_AUDIT_KEY.
+
+    Without either, a random key is used for this run only, so its hashes can still be
+    compared within one log but can't be matched against other runs.
+    """
+    key = key or os.environ.get(AUDIT_KEY_ENV)
+    if key:
+        return key.encode("utf-8")
+    warnings.warn(f"no audit key given (--audit-key-file or ${AUDIT_KEY_ENV}); "
+                  "using a random key for this run only")
+    return secrets.token_bytes(32)
+
+def hash_value(value: str, key: bytes) -> str:
+    # Keyed, so low-entropy values like phone numbers can't be brute-forced from the log
+    return hmac.new(key, value.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+class AuditLog(ABC):
+    """
+    Streams one audit record per applied redaction to disk, buffering flush_every records at a time.
+
+    Records carry row, column, span, label, detector and an HMAC-SHA256 of the redacted
+    text. The raw text itself is only written when include_values is set.
+
+    Records go to a temporary file next to path, which close() moves into place and
+    discard() deletes. Used as a context manager, the log is only kept if the block
+    finishes without an error.
+    """
+
+    def __init__(self, path: str, key: bytes, include_values: bool = False, flush_every: int = 4096):
+        self.path = path
+        self.tmp_path = path + ".part"
+        self.key = key
+        self.include_values = include_values
+        self.flush_every = max(1, flush_every)
+        self.count = 0
+        self._buffer: List[Dict[str, Any]] = []
+
+    def write(self, d: Detection, value: Optional[str] = None, row: Optional[int] = None) -> None:
+        """
+        Record a redaction. value is the text actually replaced (defaults to d.value) and
+        row its positional row number (defaults to d.row).
+        """
+        if value is None:
+            value = d.value
+        record = {
+            "row": int(d.row if row is None else row),
+            "column": str(d.col),
+            "start": int(d.start),
+            "end": int(d.end),
+            "label": d.label,
+            "detector": d.detector,
+            "hash": HASH_SCHEME,
+            "value_hash": hash_value(value, self.key),
+        }
+        if self.include_values:
+            record["value"] = value
+        self._buffer.append(record)
+        self.count += 1
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._write_records(self._buffer)
+            self._buffer = []
+
+    def close(self) -> None:
+        """Flush, close the sink and move the finished log to path."""
+        self.flush()
+        self._close_sink()
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self) -> None:
+        """Close the sink and delete the partial log without keeping it."""
+        self._buffer = []
+        self._close_sink()
+        os.remove(self.tmp_path)
+
+    @abstractmethod
+    def _write_records(self, records: List[Dict[str, Any]]) -> None:
+        """Write one flushed buffer of records to the sink."""
+
+    @abstractmethod
+    def _close_sink(self) -> None:
+        """Close the underlying file or writer."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class JsonlAuditLog(AuditLog):
+    """JSON Lines, gzip-compressed when the path ends in .gz."""
+
+    def __init__(self, path: str, key: bytes, include_values: bool = False, flush_every: int = 4096):
+        super().__init__(path, key, include_values, flush_every)
+        if path.endswith(".gz"):
+            self._file = gzip.open(self.tmp_path, "wt", encoding="utf-8", compresslevel=6)
+        else:
+            self._file = open(self.tmp_path, "w", encoding="utf-8")
+
+    def _write_records(self, records: List[Dict[str, Any]]) -> None:
+        self._file.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+
+    def _close_sink(self) -> None:
+        self._file.close()
+
+
+class ParquetAuditLog(AuditLog):
+    """Parquet via pyarrow, one row group per flushed buffer."""
+
+    def __init__(self, path: str, key: bytes, include_values: bool = False, flush_every: int = 65536):
+        super().__init__(path, key, include_values, flush_every)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet audit logs need pyarrow (pip install pyarrow)") from e
+
+        fields = [
+            pa.field("row", pa.int64()),
+            pa.field("column", pa.string()),
+            pa.field("start", pa.int64()),
+            pa.field("end", pa.int64()),
+            pa.field("label", pa.string()),
+            pa.field("detector", pa.string()),
+            pa.field("hash", pa.string()),
+            pa.field("value_hash", pa.string()),
+        ]
+        if include_values:
+            fields.append(pa.field("value", pa.string()))
+
+        self._pa = pa
+        self._schema = pa.schema(fields)
+        self._writer = pq.ParquetWriter(self.tmp_path, self._schema, compression="zstd")
+
+    def _write_records(self, records: List[Dict[str, Any]]) -> None:
+        columns = {name: [r[name] for r in records] for name in self._schema.names}
+        self._writer.write_table(self._pa.table(columns, schema=self._schema))
+
+    def _close_sink(self) -> None:
+        self._writer.close()
+
+
+def open_audit_log(path: str, key: Optional[str] = None, include_values: bool = False) -> AuditLog:
+    """Pick the audit log format from the file extension (.parquet, .jsonl.gz or .jsonl)."""
+    key_bytes = resolve_audit_key(key)
+    if path.endswith(".parquet"):
+        return ParquetAuditLog(path, key_bytes, include_values)
+    return JsonlAuditLog(path, key_bytes, include_values)
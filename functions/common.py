@@ -10,5 +10,14 @@ class Detection:
     end: int            # character end (exclusive)
     label: str          # e.g. 'EMAIL', 'PHONE', 'CREDIT_CARD', 'IP', 'PERSON', 'ORG', 'LOCATION'
     value: str          # the exact matched text
+    detector: str = ""  # which detector produced it: 'regex', 'spacy' or 'hf'
 
 RedactionSummary = Dict[str, Dict[str, int]]
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of values (0.0 if empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
@@ -1,5 +1,5 @@
 import pandas as pd
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 def read_csv(path: str, sample_rows: Optional[int] = None) -> pd.DataFrame:
     df = pd.read_csv(path, dtype = str)
@@ -7,6 +7,78 @@ def read_csv(path: str, sample_rows: Optional[int] = None) -> pd.DataFrame:
         df = df.head(sample_rows)
     return df
 
+# Field states for scanning raw CSV bytes, following pandas' C tokenizer: a quote only
+# opens quoting at the very start of a field, and anywhere else it is a literal character.
+QUOTE = ord('"')
+DELIMITER = ord(",")
+FIELD_START, UNQUOTED, QUOTED, QUOTE_IN_QUOTED = range(4)
+
+def scan_csv_state(data: bytes, state: int = FIELD_START) -> int:
+    """Advance the field state over data and return the state after its last byte."""
+    for c in data:
+        if state == QUOTED:
+            if c == QUOTE:
+                state = QUOTE_IN_QUOTED
+        elif state == QUOTE_IN_QUOTED:
+            # "" is an escaped quote; anything else after a closing quote ends the quoting
+            if c == QUOTE:
+                state = QUOTED
+            elif c == DELIMITER:
+                state = FIELD_START
+            else:
+                state = UNQUOTED
+        elif c == DELIMITER:
+            state = FIELD_START
+        elif state == FIELD_START and c == QUOTE:
+            state = QUOTED
+        else:
+            state = UNQUOTED
+    return state
+
+def csv_row_offsets(path: str, sample_rows: Optional[int] = None) -> List[Tuple[int, int]]:
+    """
+    Byte (start, end) span of every data row in the CSV, in the same order as read_csv's rows.
+
+    A record runs over physical lines while a quoted field is still open, and blank or
+    whitespace-only lines between records are skipped just like pandas does. The end
+    includes the row's line terminator.
+    """
+    offsets: List[Tuple[int, int]] = []
+    header_seen = False
+    start = None
+    state = FIELD_START
+    pos = 0
+
+    with open(path, "rb") as f:
+        for line in f:
+            if start is None:
+                if not line.strip(b" \t\r\n"):
+                    pos += len(line)
+                    continue
+                start = pos
+
+            # Lines without quotes can't open or close quoting, so skip the byte scan
+            if state == QUOTED or QUOTE in line:
+                state = scan_csv_state(line, state)
+            pos += len(line)
+            if state == QUOTED:
+                continue
+
+            if header_seen:
+                offsets.append((start, pos))
+            header_seen = True
+            start = None
+            state = FIELD_START
+
+            if sample_rows and len(offsets) >= sample_rows:
+                break
+
+    # Unterminated quoted field at end of file
+    if start is not None and header_seen:
+        offsets.append((start, pos))
+
+    return offsets
+
 def get_text_columns(df: pd.DataFrame, min_text_ratio: float = 0.6) -> List[str]:
     text_cols = []
     for col in df.columns:
@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import json
+import time
+from typing import List, Optional, Tuple
+
+from functions.common import percentile
+
+SAMPLE_RECORDS = [
+    {"name": "Alice Tan", "email": "alice@example.com", "notes": "Call me at 555-123-4567"},
+    {"name": "Bob Lim", "email": "bob.lim@example.org", "notes": "Met Bob at Google in Singapore"},
+    {"name": "Carol", "email": "", "notes": "Server 10.0.0.12 flagged card 4111 1111 1111 1111"},
+    {"name": "Dan", "email": "dan@example.net", "notes": "No issues reported this week"},
+]
+
+
+async def _open(host: str, port: int, unix_path: Optional[str]):
+    if unix_path:
+        return await asyncio.open_unix_connection(unix_path)
+    return await asyncio.open_connection(host, port)
+
+
+async def _request(reader, writer, method: str, path: str, payload: Optional[dict] = None) -> Tuple[int, dict]:
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\n"
+        f"Host: localhost\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value.strip())
+    data = await reader.readexactly(length) if length else b"{}"
+    return status, json.loads(data)
+
+
+async def _client(host, port, unix_path, jobs, records_per_request, latencies, failures):
+    reader, writer = await _open(host, port, unix_path)
+    try:
+        for i in jobs:
+            records = [SAMPLE_RECORDS[(i + k) % len(SAMPLE_RECORDS)] for k in range(records_per_request)]
+            started = time.perf_counter()
+            status, _ = await _request(reader, writer, "POST", "/redact", {"records": records})
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                failures.append(status)
+    finally:
+        writer.close()
+
+
+async def run(
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        unix_path: Optional[str] = None,
+        concurrency: int = 16,
+        requests: int = 1000,
+        records_per_request: int = 1
+) -> None:
+    latencies: List[float] = []
+    failures: List[int] = []
+    # Shared iterator, so faster clients pick up more of the work
+    jobs = iter(range(requests))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, unix_path, jobs, records_per_request, latencies, failures)
+        for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+
+    reader, writer = await _open(host, port, unix_path)
+    _, server_stats = await _request(reader, writer, "GET", "/stats")
+    writer.close()
+
+    print(f"Requests: {len(latencies)} ({len(failures)} failed) over {elapsed:.2f}s "
+          f"with concurrency {concurrency}, {records_per_request} record(s) each")
+    print(f"Throughput: {len(latencies) / elapsed:.1f} req/s, "
+          f"{len(latencies) * records_per_request / elapsed:.1f} records/s")
+    for pct in (50, 90, 99):
+        print(f"Client p{pct}: {percentile(latencies, pct) * 1000:.2f} ms")
+    print("Server stats:")
+    print(json.dumps(server_stats, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the redaction service.")
+    parser.add_argument("--host", default="127.0.0.1", help="Service host")
+    parser.add_argument("--port", type=int, default=8765, help="Service TCP port")
+    parser.add_argument("--unix", default=None, help="Connect to this Unix socket instead of TCP")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent client connections")
+    parser.add_argument("--requests", type=int, default=1000, help="Total requests to send")
+    parser.add_argument("--records", type=int, default=1, help="Records per request")
+    args = parser.parse_args()
+
+    asyncio.run(run(
+        host=args.host,
+        port=args.port,
+        unix_path=args.unix,
+        concurrency=args.concurrency,
+        requests=args.requests,
+        records_per_request=args.records
+    ))
+
+
+if __name__ == "__main__":
+    main()
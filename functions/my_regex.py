@@ -41,7 +41,8 @@ def find_emails(detection_list, text, col, rowid):
             start = match.start(),
             end = match.end(),
             label = "EMAIL",
-            value = match.group()
+            value = match.group(),
+            detector = "regex"
         )
         detection_list.append(new_detection)
 
@@ -57,7 +58,8 @@ def find_phones(detection_list, text, col, rowid):
             start = match.start(),
             end = match.end(),
             label = "PHONE",
-            value = match.group()
+            value = match.group(),
+            detector = "regex"
         )
         detection_list.append(new_detection)
 
@@ -72,7 +74,8 @@ def find_credit_cards(detection_list, text, col, rowid):
             start = match.start(),
             end = match.end(),
             label = "CREDIT_CARD",
-            value = match.group()
+            value = match.group(),
+            detector = "regex"
         )
         detection_list.append(new_detection)
 
@@ -87,6 +90,7 @@ def find_ips(detection_list, text, col, rowid):
             start = match.start(),
             end = match.end(),
             label = "IP",
-            value = match.group()
+            value = match.group(),
+            detector = "regex"
         )
         detection_list.append(new_detection)
@@ -1,24 +1,36 @@
-from typing import Iterable, List
+from typing import Any, Iterable, List, Tuple
 import pandas as pd
 import numpy as np
 from functions.common import Detection
-import spacy
-from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline
+
+
+def _text_cells(series: pd.Series) -> List[Tuple[Any, str]]:
+    """Collect the (index, stripped text) pairs of a column that are worth running NER on."""
+    cells: List[Tuple[Any, str]] = []
+    for idx, val in series.items():
+        if val is None or (isinstance(val, float) and np.isnan(val)):
+            continue
+        text = str(val).strip()
+        if text:
+            cells.append((idx, text))
+    return cells
 
 
 # spacy loader + detection
 
 def load_spacy(model_name: str = "en_core_web_sm"):
     """Load a spaCy NER model."""
+    import spacy
     return spacy.load(model_name)
 
 def detect_spacy(
         df: pd.DataFrame,
         text_columns: List[str],
         model=None,
-        labels: Iterable[str] = ("PERSON", "ORG", "GPE")
+        labels: Iterable[str] = ("PERSON", "ORG", "GPE"),
+        batch_size: int = 64
 ) -> List[Detection]:
-    """Detect entities using a spaCy model."""
+    """Detect entities using a spaCy model, feeding each column through nlp.pipe."""
     if model is None:
         model = load_spacy()
 
@@ -26,14 +38,12 @@ def detect_spacy(
     wanted = set(labels)
 
     for col in text_columns:
-        for idx, val in df[col].items():
-            if val is None or (isinstance(val, float) and np.isnan(val)):
-                continue
-            text = str(val).strip()
-            if not text:
-                continue
-
-            doc = model(text)
+        cells = _text_cells(df[col])
+        if not cells:
+            continue
+
+        docs = model.pipe((text for _, text in cells), batch_size=batch_size)
+        for (idx, _), doc in zip(cells, docs):
             for ent in doc.ents:
                 if ent.label_ in wanted:
                     detections.append(
@@ -44,6 +54,7 @@ def detect_spacy(
                             end=ent.end_char,
                             value=ent.text,
                             label=ent.label_,
+                            detector="spacy",
                         )
                     )
     return detections
@@ -54,6 +65,7 @@ def detect_spacy(
 
 def load_hf(model_name: str = "dslim/bert-large-NER"):
     """Load a HuggingFace NER pipeline."""
+    from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline
     tokenizer = AutoTokenizer.from_pretrained(model_name)
     model = AutoModelForTokenClassification.from_pretrained(model_name)
     return pipeline("ner", model=model, tokenizer=tokenizer, aggregation_strategy="simple")
@@ -62,9 +74,10 @@ def detect_hf(
         df: pd.DataFrame,
         text_columns: List[str],
         model=None,
-        labels: Iterable[str] = ("PER", "ORG", "LOC")
+        labels: Iterable[str] = ("PER", "ORG", "LOC"),
+        batch_size: int = 16
 ) -> List[Detection]:
-    """Detect entities using a HuggingFace NER model."""
+    """Detect entities using a HuggingFace NER model, batching each column's cells."""
     if model is None:
         model = load_hf()
 
@@ -72,14 +85,12 @@ def detect_hf(
     wanted = set(labels)
 
     for col in text_columns:
-        for idx, val in df[col].items():
-            if val is None or (isinstance(val, float) and np.isnan(val)):
-                continue
-            text = str(val).strip()
-            if not text:
-                continue
-
-            ents = model(text)
+        cells = _text_cells(df[col])
+        if not cells:
+            continue
+
+        results = model([text for _, text in cells], batch_size=batch_size)
+        for (idx, text), ents in zip(cells, results):
             for ent in ents:
                 if ent["entity_group"] in wanted:
                     detections.append(
@@ -90,6 +101,7 @@ def detect_hf(
                             end=ent["end"],
                             value=text[ent["start"]:ent["end"]],
                             label=ent["entity_group"],
+                            detector="hf",
                         )
                     )
     return detections
@@ -0,0 +1,149 @@
+from collections import defaultdict
+from typing import BinaryIO, Dict, List, Tuple
+
+import pandas as pd
+
+from functions.common import Detection
+from functions.ingest import DELIMITER, FIELD_START, QUOTE, QUOTED, QUOTE_IN_QUOTED, UNQUOTED
+
+COPY_CHUNK = 1024 * 1024
+
+# pandas' default na_values: read_csv turns any of these into NaN, even with dtype=str
+NA_VALUES = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+}
+
+
+def _copy_range(src: BinaryIO, dst: BinaryIO, start: int, end: int) -> None:
+    src.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        chunk = src.read(min(COPY_CHUNK, remaining))
+        if not chunk:
+            break
+        dst.write(chunk)
+        remaining -= len(chunk)
+
+def _parse_fields(row: bytes) -> List[Tuple[int, int, str]]:
+    # (start, end, decoded value) of each field in a raw CSV record, excluding the line
+    # terminator, using the same quoting rules as scan_csv_state. Quotes and commas are
+    # ASCII, so scanning UTF-8 bytes directly is safe.
+    end = len(row.rstrip(b"\r\n"))
+    fields: List[Tuple[int, int, str]] = []
+    value = bytearray()
+    start = 0
+    state = FIELD_START
+
+    for i in range(end):
+        c = row[i]
+        if state == QUOTED:
+            if c == QUOTE:
+                state = QUOTE_IN_QUOTED
+            else:
+                value.append(c)
+        elif state == QUOTE_IN_QUOTED:
+            if c == QUOTE:
+                value.append(c)
+                state = QUOTED
+            elif c == DELIMITER:
+                fields.append((start, i, value.decode("utf-8")))
+                value = bytearray()
+                start = i + 1
+                state = FIELD_START
+            else:
+                value.append(c)
+                state = UNQUOTED
+        elif c == DELIMITER:
+            fields.append((start, i, value.decode("utf-8")))
+            value = bytearray()
+            start = i + 1
+            state = FIELD_START
+        elif state == FIELD_START and c == QUOTE:
+            state = QUOTED
+        else:
+            value.append(c)
+            state = UNQUOTED
+
+    fields.append((start, end, value.decode("utf-8")))
+    return fields
+
+def _matches(raw_value: str, parsed) -> bool:
+    if pd.isna(parsed):
+        return raw_value in NA_VALUES
+    return raw_value == parsed
+
+def _encode_field(value: str, raw: bytes) -> bytes:
+    # Keep the original quoting if there was any; otherwise quote only when required
+    if raw.startswith(b'"') or any(ch in value for ch in ',"\r\n'):
+        value = '"' + value.replace('"', '""') + '"'
+    return value.encode("utf-8")
+
+def _rewrite_row(row: bytes, parsed: List, changes: Dict[int, str]) -> bytes:
+    fields = _parse_fields(row)
+
+    # The raw bytes must parse to exactly the row pandas produced, or we'd be splicing
+    # redactions into the wrong record
+    if len(fields) != len(parsed):
+        raise ValueError(f"raw row has {len(fields)} fields but the parsed row has {len(parsed)}")
+    for (_, _, raw_value), value in zip(fields, parsed):
+        if not _matches(raw_value, value):
+            raise ValueError("raw CSV row does not match the parsed row")
+
+    out = bytearray(row)
+    # Splice from the rightmost field so earlier spans stay valid
+    for idx in sorted(changes, reverse=True):
+        s, e, _ = fields[idx]
+        out[s:e] = _encode_field(changes[idx], bytes(row[s:e]))
+
+    return bytes(out)
+
+def write_passthrough(
+        input_path: str,
+        output_path: str,
+        df: pd.DataFrame,
+        redacted_df: pd.DataFrame,
+        detections: List[Detection],
+        offsets: List[Tuple[int, int]],
+) -> int:
+    """
+    Write output_path as a byte copy of input_path with only the redacted fields rewritten.
+
+    offsets are the data-row byte spans from csv_row_offsets, one per row of df. Raises
+    ValueError if the raw file and the parsed frame don't line up, in which case the
+    caller should fall back to a full to_csv. Returns the number of rows rewritten.
+    """
+    if len(offsets) != len(df):
+        raise ValueError(f"found {len(offsets)} raw rows but the frame has {len(df)}")
+
+    # row position -> {column position: redacted text}
+    changed: Dict[int, Dict[int, str]] = defaultdict(dict)
+    for d in detections:
+        before = df.at[d.row, d.col]
+        after = redacted_df.at[d.row, d.col]
+        if pd.isna(before) or after == before:
+            continue
+        changed[df.index.get_loc(d.row)][df.columns.get_loc(d.col)] = str(after)
+
+    stop = offsets[-1][1] if offsets else None
+
+    with open(input_path, "rb") as src, open(output_path, "wb") as dst:
+        if stop is None:
+            src.seek(0, 2)
+            stop = src.tell()
+
+        pos = 0
+        for r in sorted(changed):
+            start, end = offsets[r]
+            _copy_range(src, dst, pos, start)
+            src.seek(start)
+            dst.write(_rewrite_row(src.read(end - start), df.iloc[r].tolist(), changed[r]))
+            pos = end
+        _copy_range(src, dst, pos, stop)
+
+        # Keep trailing blank lines too, unless a sample cut off real rows after stop
+        tail = src.read(COPY_CHUNK)
+        if not tail.strip(b" \t\r\n") and not src.read(1):
+            dst.write(tail)
+
+    return len(changed)
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from collections import Counter, defaultdict
+from dataclasses import replace
 import pandas as pd
 
+from functions.audit import AuditLog
 from functions.common import Detection, RedactionSummary
 
 def _length(d: Detection) -> int:
@@ -33,19 +35,18 @@ def _coalesce_spans(spans: List[Detection]) -> List[Detection]:
         last_len = last.end - last.start
         d_len = d.end - d.start
         if d_len > last_len:
-            chosen_label = d.label
-            chosen_value = d.value
+            chosen = d
         else:
-            chosen_label = last.label
-            chosen_value = last.value
+            chosen = last
 
         merged[-1] = Detection(
             row=last.row,
             col=last.col,
             start=new_start,
             end=new_end,
-            label=chosen_label,
-            value=chosen_value,
+            label=chosen.label,
+            value=chosen.value,
+            detector=chosen.detector,
         )
 
     return merged
@@ -63,13 +64,14 @@ def dedupe_overlaps(detections: List[Detection]) -> List[Detection]:
 
     return cleaned
 
-def _apply_cell(text: str, spans: List[Detection], token: str) -> Tuple[str, int]:
+def _apply_cell(text: str, spans: List[Detection], token: str) -> Tuple[str, List[Detection]]:
+    # Returns the new text and the spans actually replaced, clamped to the text
     if not spans or not text:
-        return text, 0
+        return text, []
 
     # Sort descending by start so we can slice safely
     spans_sorted = sorted(spans, key=lambda d: d.start, reverse=True)
-    replaced = 0
+    applied: List[Detection] = []
     for d in spans_sorted:
         # Guard against pathological indices in case of unexpected input.
         s, e = max(0, d.start), max(0, d.end)
@@ -83,13 +85,14 @@ def _apply_cell(text: str, spans: List[Detection], token: str) -> Tuple[str, int
         else:
             text = text[:s] + token + text[e:]
 
-        replaced += 1
-    return text, replaced
+        applied.append(d if (s, e) == (d.start, d.end) else replace(d, start=s, end=e))
+    return text, applied
 
 def apply_redactions(
         df: pd.DataFrame,
         detections: List[Detection],
         token: str = "",
+        audit: Optional[AuditLog] = None,
 ) -> Tuple[pd.DataFrame, RedactionSummary]:
 
     out = df.copy()
@@ -112,13 +115,15 @@ def apply_redactions(
 
         text = "" if original is None else str(original)
 
-        new_text, count = _apply_cell(text, spans, token)
-        if count > 0:
+        new_text, applied = _apply_cell(text, spans, token)
+        if applied:
             out.at[row, col] = new_text
-            total += count
-            col_counter[col] += count
-            for d in spans:
+            total += len(applied)
+            col_counter[col] += len(applied)
+            for d in applied:
                 label_counter[d.label] += 1
+                if audit is not None:
+                    audit.write(d, text[d.start:d.end], row=out.index.get_loc(row))
 
     summary: RedactionSummary = {
         "total": {"count": int(total)},
@@ -1,50 +1,51 @@
 import argparse
-from typing import Optional
+import warnings
+from contextlib import nullcontext
+from typing import List, Optional
 
-from functions.ingest import read_csv, get_text_columns
+import pandas as pd
+
+from functions.audit import AUDIT_KEY_ENV, open_audit_log
+from functions.common import Detection
+from functions.ingest import read_csv, get_text_columns, csv_row_offsets
 from functions.my_regex import detect_regex
 from functions.ner import load_spacy, detect_spacy, load_hf, detect_hf
+from functions.passthrough import write_passthrough
 from functions.redact import apply_redactions, dedupe_overlaps
 
 
-def sanitize_file(
-        input_path: str,
-        output_path: str,
-        sample_rows: Optional[int] = None,
-        use_ner: bool = True,
-        use_spacy: bool = True,
-        use_hf: bool = True,
-        token: str = "[REDACTED]",
+def find_detections(
+        df: pd.DataFrame,
+        spacy_model=None,
+        hf_model=None,
         intersection: bool = False
-) -> dict:
-
-    # 1) Load data
-    df = read_csv(input_path, sample_rows)
+) -> List[Detection]:
+    """Run regex plus whichever NER models are given over df and return deduped hits."""
 
-    # 2) Regex detections
+    # Regex detections
     regex_hits = detect_regex(df)
 
-    # 3) Which columns are text?
+    # Which columns are text?
     text_cols = get_text_columns(df)
 
     spacy_hits, hf_hits = [], []
 
-    if use_ner:
-        if use_spacy:
-            spacy_hits = detect_spacy(
-                df, text_cols,
-                model=load_spacy(),
-                labels=("PERSON", "ORG", "GPE", "NORP")
-            )
-        if use_hf:
-            hf_hits = detect_hf(
-                df, text_cols,
-                model=load_hf(),
-                labels=("PER", "ORG", "LOC")
-            )
-
-    # 4) Combine or intersect NER hits
-    if intersection and spacy_hits and hf_hits:
+    if spacy_model is not None:
+        spacy_hits = detect_spacy(
+            df, text_cols,
+            model=spacy_model,
+            labels=("PERSON", "ORG", "GPE", "NORP")
+        )
+    if hf_model is not None:
+        hf_hits = detect_hf(
+            df, text_cols,
+            model=hf_model,
+            labels=("PER", "ORG", "LOC")
+        )
+
+    # Combine or intersect NER hits. Whether to intersect depends only on which models are
+    # loaded, never on the hits, so a row's result can't change with the rest of the frame.
+    if intersection and spacy_model is not None and hf_model is not None:
         # keep only hits where span + label match
         spacy_set = {(d.row, d.col, d.start, d.end, d.label) for d in spacy_hits}
         hf_set = {(d.row, d.col, d.start, d.end, d.label) for d in hf_hits}
@@ -53,16 +54,58 @@ def sanitize_file(
     else:
         ner_hits = spacy_hits + hf_hits
 
-    # 5) Combine with regex hits + dedupe
-    hits = dedupe_overlaps(regex_hits + ner_hits)
+    # Combine with regex hits + dedupe
+    return dedupe_overlaps(regex_hits + ner_hits)
 
-    # 6) Apply redactions
-    redacted_df, summary = apply_redactions(df, hits, token)
 
-    # 7) Write out CSV
-    redacted_df.to_csv(output_path, index=False)
+def sanitize_file(
+        input_path: str,
+        output_path: str,
+        sample_rows: Optional[int] = None,
+        use_ner: bool = True,
+        use_spacy: bool = True,
+        use_hf: bool = True,
+        token: str = "[REDACTED]",
+        intersection: bool = False,
+        passthrough: bool = False,
+        audit_log: Optional[str] = None,
+        audit_values: bool = False,
+        audit_key: Optional[str] = None
+) -> dict:
 
-    # 8) Return summary
+    # 0) Open the audit log first, so a bad path or missing pyarrow fails before any real work
+    audit = open_audit_log(audit_log, key=audit_key, include_values=audit_values) if audit_log else None
+
+    # The log is only kept once the output CSV is written, so it never lists redactions
+    # that didn't reach the output
+    with audit if audit is not None else nullcontext():
+        # 1) Load data
+        df = read_csv(input_path, sample_rows)
+
+        # 2) Load the requested NER models
+        spacy_model = load_spacy() if use_ner and use_spacy else None
+        hf_model = load_hf() if use_ner and use_hf else None
+
+        # 3) Regex + NER detections, combined and deduped
+        hits = find_detections(df, spacy_model, hf_model, intersection)
+
+        # 4) Apply redactions, streaming each one to the audit log if requested
+        redacted_df, summary = apply_redactions(df, hits, token, audit=audit)
+
+        # 5) Write out CSV, copying untouched rows byte-for-byte if asked
+        written = False
+        if passthrough:
+            try:
+                write_passthrough(input_path, output_path, df, redacted_df, hits,
+                                  csv_row_offsets(input_path, sample_rows))
+                written = True
+            except ValueError as e:
+                # Raw rows didn't line up with the parsed frame; re-serialize everything instead
+                warnings.warn(f"passthrough output disabled, rewriting the whole CSV: {e}")
+        if not written:
+            redacted_df.to_csv(output_path, index=False)
+
+    # 6) Return summary
     return summary
 
 
@@ -76,8 +119,22 @@ def main():
     parser.add_argument("--no-hf", action="store_true", help="Disable HuggingFace NER")
     parser.add_argument("--intersection", action="store_true", help="Use intersection of spaCy and HF")
     parser.add_argument("--token", default="[REDACTED]", help="Replacement token")
+    parser.add_argument("--passthrough", action="store_true",
+                        help="Copy unredacted rows byte-for-byte from the input")
+    parser.add_argument("--audit-log", default=None,
+                        help="Stream every redaction to this .jsonl, .jsonl.gz or .parquet file")
+    parser.add_argument("--audit-values", action="store_true",
+                        help="Include raw redacted values in the audit log (hashes only by default)")
+    parser.add_argument("--audit-key-file", default=None,
+                        help=f"File holding the HMAC key for audit log hashes (defaults to ${AUDIT_KEY_ENV})")
     args = parser.parse_args()
 
+    # Read the key from a file rather than argv, where it would show up in ps and shell history
+    audit_key = None
+    if args.audit_key_file:
+        with open(args.audit_key_file, encoding="utf-8") as f:
+            audit_key = f.read().strip()
+
     summary = sanitize_file(
         input_path=args.input,
         output_path=args.output,
@@ -86,7 +143,11 @@ def main():
         use_spacy=not args.no_spacy,
         use_hf=not args.no_hf,
         token=args.token,
-        intersection=args.intersection
+        intersection=args.intersection,
+        passthrough=args.passthrough,
+        audit_log=args.audit_log,
+        audit_values=args.audit_values,
+        audit_key=audit_key
     )
 
     print("Redaction summary:")
@@ -0,0 +1,375 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from functions.common import Detection, percentile
+from functions.ner import load_spacy, load_hf
+from functions.redact import apply_redactions
+from functions.sanitize import find_detections
+
+Record = Dict[str, Any]
+
+MAX_BODY_BYTES = 8 * 1024 * 1024
+
+
+class Redactor:
+    """Holds the loaded models and redacts a list of records in one pass."""
+
+    def __init__(
+            self,
+            use_ner: bool = True,
+            use_spacy: bool = True,
+            use_hf: bool = True,
+            token: str = "[REDACTED]",
+            intersection: bool = False
+    ):
+        self.spacy_model = load_spacy() if use_ner and use_spacy else None
+        self.hf_model = load_hf() if use_ner and use_hf else None
+        self.token = token
+        self.intersection = intersection
+
+    def __call__(self, records: List[Record]) -> List[dict]:
+        # One DataFrame row per record, so the NER detectors see the whole micro-batch at once
+        df = pd.DataFrame.from_records(
+            [{k: None if v is None else str(v) for k, v in r.items()} for r in records],
+            index=range(len(records)),
+        )
+        hits = find_detections(df, self.spacy_model, self.hf_model, self.intersection)
+        redacted_df, _ = apply_redactions(df, hits, self.token)
+
+        by_row: Dict[int, List[Detection]] = defaultdict(list)
+        for d in hits:
+            by_row[d.row].append(d)
+
+        results = []
+        for i, record in enumerate(records):
+            spans = sorted(by_row.get(i, []), key=lambda d: (str(d.col), d.start))
+            # Values without a redaction go back exactly as sent, keeping their JSON type
+            changed = {d.col for d in spans if redacted_df.at[i, d.col] != df.at[i, d.col]}
+            results.append({
+                "redacted": {
+                    col: (redacted_df.at[i, col] if col in changed else value)
+                    for col, value in record.items()
+                },
+                "detections": [
+                    {"col": d.col, "start": d.start, "end": d.end, "label": d.label,
+                     "detector": d.detector, "value": d.value}
+                    for d in spans
+                ],
+            })
+        return results
+
+
+class ServiceStats:
+    """Rolling latency window plus request/batch counters."""
+
+    def __init__(self, window: int = 10000):
+        self.request_latencies: Deque[float] = deque(maxlen=window)
+        self.batch_latencies: Deque[float] = deque(maxlen=window)
+        self.requests = 0
+        self.records = 0
+        self.batches = 0
+        self.errors = 0
+
+    def record_request(self, seconds: float, n_records: int) -> None:
+        self.request_latencies.append(seconds)
+        self.requests += 1
+        self.records += n_records
+
+    def record_batch(self, seconds: float) -> None:
+        self.batch_latencies.append(seconds)
+        self.batches += 1
+
+    @staticmethod
+    def _summarize(latencies: Deque[float]) -> Dict[str, float]:
+        values = list(latencies)
+        return {
+            "p50": round(percentile(values, 50) * 1000, 3),
+            "p90": round(percentile(values, 90) * 1000, 3),
+            "p99": round(percentile(values, 99) * 1000, 3),
+            "max": round(max(values, default=0.0) * 1000, 3),
+        }
+
+    def snapshot(self, queue_depth: int) -> dict:
+        return {
+            "requests": self.requests,
+            "records": self.records,
+            "batches": self.batches,
+            "errors": self.errors,
+            "avg_batch_size": round(self.records / self.batches, 3) if self.batches else 0.0,
+            "queue_depth": queue_depth,
+            "latency_ms": self._summarize(self.request_latencies),
+            "batch_ms": self._summarize(self.batch_latencies),
+        }
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent submissions into micro-batches of at most max_batch records.
+
+    A batch is dispatched as soon as it is full or max_wait seconds after its first
+    submission arrived. Batches run one at a time on a single worker thread, so the
+    models are never called concurrently.
+    """
+
+    def __init__(
+            self,
+            redact_fn: Callable[[List[Record]], List[dict]],
+            max_batch: int = 32,
+            max_wait: float = 0.01,
+            stats: Optional[ServiceStats] = None
+    ):
+        self.redact_fn = redact_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait)
+        self.stats = stats if stats is not None else ServiceStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._carry: Optional[Tuple[List[Record], asyncio.Future]] = None
+        self._pending = 0
+        self._task: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="redactor")
+
+    @property
+    def queue_depth(self) -> int:
+        """Records submitted but not yet picked up by a batch."""
+        return self._pending
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, records: List[Record]) -> List[dict]:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        started = time.perf_counter()
+        self._pending += len(records)
+        await self._queue.put((records, fut))
+        results = await fut
+        self.stats.record_request(time.perf_counter() - started, len(records))
+        return results
+
+    async def _next_batch(self) -> List[Tuple[List[Record], asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+
+        if self._carry is not None:
+            first, self._carry = self._carry, None
+        else:
+            first = await self._queue.get()
+
+        batch = [first]
+        size = len(first[0])
+        deadline = loop.time() + self.max_wait
+
+        while size < self.max_batch:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            # Don't split a submission; hold it over if it would overflow this batch
+            if size + len(item[0]) > self.max_batch:
+                self._carry = item
+                break
+            batch.append(item)
+            size += len(item[0])
+
+        self._pending -= size
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            records = [r for recs, _ in batch for r in recs]
+
+            started = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self._executor, self.redact_fn, records)
+            except Exception as exc:
+                self.stats.errors += 1
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(exc)
+                continue
+            self.stats.record_batch(time.perf_counter() - started)
+
+            pos = 0
+            for recs, fut in batch:
+                if not fut.done():
+                    fut.set_result(results[pos:pos + len(recs)])
+                pos += len(recs)
+
+
+class RedactionServer:
+    """Minimal HTTP/1.1 front end (TCP or Unix socket) for a MicroBatcher."""
+
+    REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 500: "Internal Server Error"}
+
+    def __init__(self, batcher: MicroBatcher):
+        self.batcher = batcher
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, dict]:
+        if path == "/health":
+            return 200, {"status": "ok"}
+
+        if path == "/stats":
+            if method != "GET":
+                return 405, {"error": "use GET"}
+            return 200, self.batcher.stats.snapshot(self.batcher.queue_depth)
+
+        if path == "/redact":
+            if method != "POST":
+                return 405, {"error": "use POST"}
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                return 400, {"error": "body is not valid JSON"}
+
+            if not isinstance(payload, dict):
+                return 400, {"error": "body must be a JSON object"}
+            single = "record" in payload
+            records = [payload["record"]] if single else payload.get("records")
+            if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+                return 400, {"error": "expected {\"record\": {...}} or {\"records\": [{...}, ...]}"}
+            if any(isinstance(v, (dict, list)) for r in records for v in r.values()):
+                return 400, {"error": "record values must be strings, numbers, booleans or null"}
+            if not records:
+                return 200, {"results": []}
+
+            try:
+                results = await self.batcher.submit(records)
+            except Exception as exc:
+                return 500, {"error": str(exc)}
+            return 200, {"result": results[0]} if single else {"results": results}
+
+        return 404, {"error": f"no route for {path}"}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode("latin-1").split()
+                if len(parts) != 3:
+                    break
+                method, path, version = parts
+
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length_txt = headers.get("content-length", "0") or "0"
+                length = int(length_txt) if length_txt.isdigit() else -1
+                if length < 0:
+                    status, payload = 400, {"error": "invalid Content-Length"}
+                    keep_alive = False
+                elif length > MAX_BODY_BYTES:
+                    status, payload = 413, {"error": "request body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self._route(method.upper(), path.split("?", 1)[0], body)
+                    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+                data = json.dumps(payload).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {self.REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(
+        redactor: Redactor,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        unix_path: Optional[str] = None,
+        max_batch: int = 32,
+        max_wait: float = 0.01
+) -> None:
+    batcher = MicroBatcher(redactor, max_batch=max_batch, max_wait=max_wait)
+    batcher.start()
+    server = RedactionServer(batcher)
+
+    if unix_path:
+        listener = await asyncio.start_unix_server(server.handle, path=unix_path)
+        print(f"Serving redaction on unix:{unix_path}")
+    else:
+        listener = await asyncio.start_server(server.handle, host, port)
+        print(f"Serving redaction on http://{host}:{port}")
+
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await batcher.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve PII redaction over HTTP with micro-batching.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port to bind")
+    parser.add_argument("--unix", default=None, help="Serve on this Unix socket path instead of TCP")
+    parser.add_argument("--max-batch", type=int, default=32, help="Most records per inference batch")
+    parser.add_argument("--max-wait-ms", type=float, default=10.0, help="Longest a batch waits to fill up")
+    parser.add_argument("--no-ner", action="store_true", help="Disable all NER")
+    parser.add_argument("--no-spacy", action="store_true", help="Disable spaCy NER")
+    parser.add_argument("--no-hf", action="store_true", help="Disable HuggingFace NER")
+    parser.add_argument("--intersection", action="store_true", help="Use intersection of spaCy and HF")
+    parser.add_argument("--token", default="[REDACTED]", help="Replacement token")
+    args = parser.parse_args()
+
+    redactor = Redactor(
+        use_ner=not args.no_ner,
+        use_spacy=not args.no_spacy,
+        use_hf=not args.no_hf,
+        token=args.token,
+        intersection=args.intersection
+    )
+
+    try:
+        asyncio.run(serve(
+            redactor,
+            host=args.host,
+            port=args.port,
+            unix_path=args.unix,
+            max_batch=args.max_batch,
+            max_wait=args.max_wait_ms / 1000.0
+        ))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import gzip
+import hashlib
+import hmac
+import json
+
+import pandas as pd
+import pytest
+
+from functions.audit import AUDIT_KEY_ENV, AuditLog, open_audit_log
+from functions.common import Detection
+from functions.redact import apply_redactions
+
+
+def _read_jsonl(path) -> list:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def _email(row: int, start: int, end: int) -> Detection:
+    return Detection(row=row, col="notes", start=start, end=end, label="EMAIL",
+                     value="x@y.com", detector="regex")
+
+
+def test_records_keyed_hash_without_raw_value(tmp_path):
+    path = tmp_path / "audit.jsonl.gz"
+    with open_audit_log(str(path), key="secret") as audit:
+        audit.write(_email(0, 0, 7), "x@y.com")
+
+    [record] = _read_jsonl(path)
+    assert record == {
+        "row": 0, "column": "notes", "start": 0, "end": 7, "label": "EMAIL", "detector": "regex",
+        "hash": "hmac-sha256",
+        "value_hash": hmac.new(b"secret", b"x@y.com", hashlib.sha256).hexdigest(),
+    }
+    assert record["value_hash"] != hashlib.sha256(b"x@y.com").hexdigest()
+
+def test_include_values(tmp_path):
+    path = tmp_path / "audit.jsonl.gz"
+    with open_audit_log(str(path), key="secret", include_values=True) as audit:
+        audit.write(_email(3, 0, 7), "x@y.com")
+    assert _read_jsonl(path)[0]["value"] == "x@y.com"
+
+def test_key_from_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv(AUDIT_KEY_ENV, "from-env")
+    path = tmp_path / "audit.jsonl.gz"
+    with open_audit_log(str(path)) as audit:
+        audit.write(_email(0, 0, 7), "x@y.com")
+    expected = hmac.new(b"from-env", b"x@y.com", hashlib.sha256).hexdigest()
+    assert _read_jsonl(path)[0]["value_hash"] == expected
+
+def test_missing_key_warns(tmp_path, monkeypatch):
+    monkeypatch.delenv(AUDIT_KEY_ENV, raising=False)
+    with pytest.warns(UserWarning, match="random key"):
+        open_audit_log(str(tmp_path / "audit.jsonl")).close()
+
+def test_audit_log_is_abstract():
+    with pytest.raises(TypeError):
+        AuditLog("unused", b"key")
+
+def test_only_applied_spans_are_audited(tmp_path):
+    df = pd.DataFrame({"notes": ["mail x@y.com"]})
+    detections = [_email(0, 5, 12), _email(0, 40, 50)]
+    path = tmp_path / "audit.jsonl.gz"
+    with open_audit_log(str(path), key="secret") as audit:
+        out, summary = apply_redactions(df, detections, "[REDACTED]", audit=audit)
+
+    assert out.at[0, "notes"] == "mail [REDACTED]"
+    assert summary["by_label"] == {"EMAIL": 1}
+    assert [(r["start"], r["end"]) for r in _read_jsonl(path)] == [(5, 12)]
+
+def test_parquet_row_is_int64(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "audit.parquet"
+    with open_audit_log(str(path), key="secret") as audit:
+        audit.write(_email(7, 0, 7), "x@y.com")
+    table = pq.read_table(str(path))
+    assert str(table.schema.field("row").type) == "int64"
+    assert table.column("row").to_pylist() == [7]
+
+def test_rows_are_positions_for_non_integer_index(tmp_path):
+    df = pd.DataFrame({"notes": ["ok", "mail x@y.com"]}, index=["a", "b"])
+    detection = Detection(row="b", col="notes", start=5, end=12, label="EMAIL", value="x@y.com")
+    path = tmp_path / "audit.jsonl.gz"
+    with open_audit_log(str(path), key="secret") as audit:
+        apply_redactions(df, [detection], "[REDACTED]", audit=audit)
+    assert [r["row"] for r in _read_jsonl(path)] == [1]
+
+def test_log_is_discarded_when_the_block_fails(tmp_path):
+    path = tmp_path / "audit.jsonl.gz"
+    with pytest.raises(RuntimeError):
+        with open_audit_log(str(path), key="secret") as audit:
+            audit.write(_email(0, 0, 7), "x@y.com")
+            raise RuntimeError("output write failed")
+    assert list(tmp_path.iterdir()) == []
+
+def test_sanitize_file_keeps_no_log_if_output_write_fails(tmp_path):
+    from functions.sanitize import sanitize_file
+
+    src = tmp_path / "in.csv"
+    src.write_text("h1,h2\na,x@y.com\n")
+    log = tmp_path / "audit.jsonl.gz"
+    with pytest.raises(OSError):
+        sanitize_file(str(src), str(tmp_path / "missing" / "out.csv"), use_ner=False,
+                      audit_log=str(log), audit_key="secret")
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["in.csv"]
+
+    sanitize_file(str(src), str(tmp_path / "out.csv"), use_ner=False,
+                  audit_log=str(log), audit_key="secret")
+    assert [r["row"] for r in _read_jsonl(log)] == [0]
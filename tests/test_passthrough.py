@@ -0,0 +1,117 @@
+import pytest
+
+from functions.ingest import read_csv, csv_row_offsets
+from functions.my_regex import detect_regex
+from functions.passthrough import write_passthrough
+from functions.redact import apply_redactions, dedupe_overlaps
+
+
+def _write(tmp_path, data: bytes) -> str:
+    path = tmp_path / "in.csv"
+    path.write_bytes(data)
+    return str(path)
+
+def _redact(tmp_path, data: bytes, sample_rows=None, offsets=None) -> bytes:
+    src = _write(tmp_path, data)
+    dst = tmp_path / "out.csv"
+    df = read_csv(src, sample_rows)
+    hits = dedupe_overlaps(detect_regex(df))
+    redacted_df, _ = apply_redactions(df, hits, "[REDACTED]")
+    if offsets is None:
+        offsets = csv_row_offsets(src, sample_rows)
+    write_passthrough(src, str(dst), df, redacted_df, hits, offsets)
+    return dst.read_bytes()
+
+
+def test_untouched_rows_are_copied_byte_for_byte(tmp_path):
+    data = b'h1,h2\n"quoted",  spaced  \na,x@y.com\n"b" , ok\n'
+    assert _redact(tmp_path, data) == b'h1,h2\n"quoted",  spaced  \na,[REDACTED]\n"b" , ok\n'
+
+def test_crlf_line_endings(tmp_path):
+    data = b"h1,h2\r\na,x@y.com\r\nb,ok\r\n"
+    assert _redact(tmp_path, data) == b"h1,h2\r\na,[REDACTED]\r\nb,ok\r\n"
+
+def test_blank_and_whitespace_only_lines(tmp_path):
+    data = b"h1,h2\n\na,ok\n   \nb,x@y.com\n\n"
+    assert _redact(tmp_path, data) == b"h1,h2\n\na,ok\n   \nb,[REDACTED]\n\n"
+
+def test_quoted_field_with_embedded_newline(tmp_path):
+    data = b'h1,h2\n"multi\nline",x@y.com\n"two\r\nlines",ok\nc,x@y.com\n'
+    assert _redact(tmp_path, data) == (
+        b'h1,h2\n"multi\nline",[REDACTED]\n"two\r\nlines",ok\nc,[REDACTED]\n'
+    )
+
+def test_escaped_quotes_and_quoting_kept(tmp_path):
+    data = b'h1,h2\n"say ""hi""","mail x@y.com, ok"\n'
+    assert _redact(tmp_path, data) == b'h1,h2\n"say ""hi""","mail [REDACTED], ok"\n'
+
+def test_text_after_closing_quote(tmp_path):
+    data = b'h1,h2\n"x""y"z,x@y.com\n'
+    assert _redact(tmp_path, data) == b'h1,h2\n"x""y"z,[REDACTED]\n'
+
+def test_redacted_value_gets_quoted_when_needed(tmp_path):
+    src = _write(tmp_path, b"h1,h2\na,x@y.com\n")
+    dst = tmp_path / "out.csv"
+    df = read_csv(src)
+    hits = dedupe_overlaps(detect_regex(df))
+    redacted_df, _ = apply_redactions(df, hits, 'a,"b')
+    write_passthrough(src, str(dst), df, redacted_df, hits, csv_row_offsets(src))
+    assert dst.read_bytes() == b'h1,h2\na,"a,""b"\n'
+
+def test_stray_quotes_inside_unquoted_fields(tmp_path):
+    data = b'h1,h2\nc,5" d\ne,6" f\na,x@y.com\nb,x@y.com\n'
+    assert _redact(tmp_path, data) == b'h1,h2\nc,5" d\ne,6" f\na,[REDACTED]\nb,[REDACTED]\n'
+    assert _redact(tmp_path, data, sample_rows=3) == b'h1,h2\nc,5" d\ne,6" f\na,[REDACTED]\n'
+
+def test_sample_rows_stops_output(tmp_path):
+    data = b"h1,h2\na,ok\nb,x@y.com\nc,x@y.com\n"
+    assert _redact(tmp_path, data, sample_rows=2) == b"h1,h2\na,ok\nb,[REDACTED]\n"
+
+def test_missing_final_newline(tmp_path):
+    data = b"h1,h2\na,ok\nb,x@y.com"
+    assert _redact(tmp_path, data) == b"h1,h2\na,ok\nb,[REDACTED]"
+
+def test_missing_values_are_left_alone(tmp_path):
+    data = b"h1,h2,h3\n,NA,x@y.com\n"
+    assert _redact(tmp_path, data) == b"h1,h2,h3\n,NA,[REDACTED]\n"
+
+def test_row_offsets(tmp_path):
+    data = b'h1,h2\r\n\r\na,"x\ny"\r\nb,5" z\r\nc,d'
+    src = _write(tmp_path, data)
+    rows = [data[s:e] for s, e in csv_row_offsets(src)]
+    assert rows == [b'a,"x\ny"\r\n', b'b,5" z\r\n', b"c,d"]
+    assert len(rows) == len(read_csv(src))
+
+def test_misaligned_offsets_raise(tmp_path):
+    data = b"h1,h2\na,x@y.com\nb,x@y.com\n"
+    offsets = csv_row_offsets(_write(tmp_path, data))
+    with pytest.raises(ValueError):
+        _redact(tmp_path, data, offsets=offsets[1:] + offsets[:1])
+
+def test_row_count_mismatch_raises(tmp_path):
+    data = b"h1,h2\na,x@y.com\nb,ok\n"
+    offsets = csv_row_offsets(_write(tmp_path, data))
+    with pytest.raises(ValueError):
+        _redact(tmp_path, data, offsets=offsets[:1])
+
+def test_sanitize_file_falls_back_with_warning(tmp_path, monkeypatch):
+    from functions import sanitize
+
+    def broken_offsets(path, sample_rows=None):
+        return []
+
+    monkeypatch.setattr(sanitize, "csv_row_offsets", broken_offsets)
+    src = _write(tmp_path, b"h1,h2\na,x@y.com\n")
+    dst = tmp_path / "out.csv"
+    with pytest.warns(UserWarning, match="passthrough"):
+        sanitize.sanitize_file(src, str(dst), use_ner=False, passthrough=True)
+    assert dst.read_text() == "h1,h2\na,[REDACTED]\n"
+
+def test_sanitize_file_falls_back_on_cr_only_line_endings(tmp_path):
+    from functions import sanitize
+
+    src = _write(tmp_path, b"h1,h2\ra,x@y.com\rb,ok\r")
+    dst = tmp_path / "out.csv"
+    with pytest.warns(UserWarning, match="passthrough"):
+        sanitize.sanitize_file(src, str(dst), use_ner=False, passthrough=True)
+    assert dst.read_text() == "h1,h2\na,[REDACTED]\nb,ok\n"
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import re
+import threading
+from types import SimpleNamespace
+
+from functions.service import MAX_BODY_BYTES, MicroBatcher, RedactionServer, Redactor
+
+
+class StubSpacy:
+    """Tags every occurrence of the given words, exposing spaCy's nlp.pipe interface."""
+
+    def __init__(self, words):
+        self.words = words
+
+    def pipe(self, texts, batch_size=64):
+        for text in texts:
+            ents = [
+                SimpleNamespace(label_=label, start_char=m.start(), end_char=m.end(), text=m.group())
+                for word, label in self.words.items()
+                for m in re.finditer(re.escape(word), text)
+            ]
+            yield SimpleNamespace(ents=ents)
+
+
+class StubHF:
+    """Tags every occurrence of the given words, like a batched HF NER pipeline."""
+
+    def __init__(self, words):
+        self.words = words
+
+    def __call__(self, texts, batch_size=16):
+        return [
+            [
+                {"entity_group": label, "start": m.start(), "end": m.end()}
+                for word, label in self.words.items()
+                for m in re.finditer(re.escape(word), text)
+            ]
+            for text in texts
+        ]
+
+
+def _redactor(spacy_words=None, hf_words=None, intersection=False) -> Redactor:
+    redactor = Redactor(use_ner=False, intersection=intersection)
+    if spacy_words is not None:
+        redactor.spacy_model = StubSpacy(spacy_words)
+    if hf_words is not None:
+        redactor.hf_model = StubHF(hf_words)
+    return redactor
+
+def _echo(records):
+    return [{"redacted": r, "detections": []} for r in records]
+
+
+def test_redacts_each_record_and_reports_detections():
+    redactor = _redactor(spacy_words={"Bob": "PERSON"})
+    first, second = redactor([
+        {"name": "Bob", "email": "bob@example.com"},
+        {"notes": "nothing here"},
+    ])
+
+    assert first["redacted"] == {"name": "[REDACTED]", "email": "[REDACTED]"}
+    assert [(d["col"], d["label"], d["detector"]) for d in first["detections"]] == [
+        ("email", "EMAIL", "regex"),
+        ("name", "PERSON", "spacy"),
+    ]
+    assert second == {"redacted": {"notes": "nothing here"}, "detections": []}
+
+def test_unredacted_values_keep_their_json_type():
+    [result] = _redactor()([{"b": True, "n": 7, "f": 1.5, "z": None, "e": "a@b.com"}])
+    assert result["redacted"] == {"b": True, "n": 7, "f": 1.5, "z": None, "e": "[REDACTED]"}
+
+def test_intersection_result_does_not_depend_on_batch_neighbours():
+    redactor = _redactor(spacy_words={"Bob": "PERSON"}, hf_words={"Acme": "ORG"}, intersection=True)
+    alone = redactor([{"n": "Bob here"}])
+    batched = redactor([{"n": "Bob here"}, {"n": "Acme corp"}])
+    assert batched[0] == alone[0]
+
+def test_batches_respect_max_batch_and_results_go_to_their_submitter():
+    sizes = []
+
+    def redact_fn(records):
+        sizes.append(len(records))
+        return [{"redacted": r, "detections": []} for r in records]
+
+    async def run():
+        batcher = MicroBatcher(redact_fn, max_batch=3, max_wait=0.05)
+        batcher.start()
+        try:
+            return await asyncio.gather(
+                batcher.submit([{"i": 0}, {"i": 1}]),
+                batcher.submit([{"i": 2}, {"i": 3}]),
+                batcher.submit([{"i": 4}]),
+            )
+        finally:
+            await batcher.stop()
+
+    results = asyncio.run(run())
+    assert [[r["redacted"]["i"] for r in res] for res in results] == [[0, 1], [2, 3], [4]]
+    # The second submission would overflow the first batch, so it's carried into the next one
+    assert sizes == [2, 3]
+
+def test_queue_depth_counts_records_waiting_for_a_batch():
+    release = threading.Event()
+
+    def redact_fn(records):
+        release.wait(5)
+        return _echo(records)
+
+    async def run():
+        batcher = MicroBatcher(redact_fn, max_batch=1, max_wait=0)
+        batcher.start()
+        try:
+            first = asyncio.ensure_future(batcher.submit([{"i": 0}]))
+            await asyncio.sleep(0.05)
+            second = asyncio.ensure_future(batcher.submit([{"i": 1}]))
+            third = asyncio.ensure_future(batcher.submit([{"i": 2}]))
+            await asyncio.sleep(0.05)
+            # The first record is being redacted; the other two are still queued
+            waiting = batcher.queue_depth
+            release.set()
+            await asyncio.gather(first, second, third)
+            return waiting, batcher.queue_depth, batcher.stats.snapshot(batcher.queue_depth)
+        finally:
+            await batcher.stop()
+
+    waiting, after, stats = asyncio.run(run())
+    assert (waiting, after) == (2, 0)
+    assert stats["requests"] == 3 and stats["batches"] == 3
+
+def test_redaction_errors_reach_every_submitter():
+    def redact_fn(records):
+        raise RuntimeError("model failed")
+
+    async def run():
+        batcher = MicroBatcher(redact_fn, max_batch=4, max_wait=0.05)
+        batcher.start()
+        try:
+            return await asyncio.gather(
+                batcher.submit([{"i": 0}]), batcher.submit([{"i": 1}]), return_exceptions=True
+            )
+        finally:
+            await batcher.stop()
+
+    assert [str(r) for r in asyncio.run(run())] == ["model failed", "model failed"]
+
+
+def _http(raw: bytes, redact_fn=_echo):
+    """Send raw request bytes to a fresh server and return (status, JSON body)."""
+
+    async def run():
+        batcher = MicroBatcher(redact_fn, max_batch=8, max_wait=0)
+        batcher.start()
+        listener = await asyncio.start_server(RedactionServer(batcher).handle, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(raw)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return response
+        finally:
+            listener.close()
+            await batcher.stop()
+
+    head, _, body = asyncio.run(run()).partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+def _post(path: str, body: bytes):
+    return _http(
+        f"POST {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+        + body
+    )
+
+def test_http_single_and_batch_requests():
+    status, payload = _post("/redact", b'{"record": {"a": "x"}}')
+    assert (status, payload) == (200, {"result": {"redacted": {"a": "x"}, "detections": []}})
+
+    status, payload = _post("/redact", b'{"records": [{"a": 1}, {"a": 2}]}')
+    assert status == 200
+    assert [r["redacted"]["a"] for r in payload["results"]] == [1, 2]
+
+def test_http_rejects_bad_bodies():
+    assert _post("/redact", b"not json")[0] == 400
+    assert _post("/redact", b"[1, 2]")[0] == 400
+    assert _post("/redact", b'{"records": ["x"]}')[0] == 400
+    assert _post("/redact", b'{"record": {"a": {"nested": 1}}}')[0] == 400
+    assert _post("/redact", b'{"record": {"a": [1]}}')[0] == 400
+
+def test_http_rejects_bad_content_length():
+    for length in ("abc", "-5"):
+        raw = f"POST /redact HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode()
+        assert _http(raw)[0] == 400
+
+    raw = f"POST /redact HTTP/1.1\r\nContent-Length: {MAX_BODY_BYTES + 1}\r\n\r\n".encode()
+    assert _http(raw)[0] == 413
+
+def test_http_wrong_method_and_unknown_route():
+    assert _http(b"GET /redact HTTP/1.1\r\nConnection: close\r\n\r\n")[0] == 405
+    assert _post("/stats", b"")[0] == 405
+    assert _http(b"GET /nope HTTP/1.1\r\nConnection: close\r\n\r\n")[0] == 404
+
+def test_http_stats():
+    status, payload = _http(b"GET /stats HTTP/1.1\r\nConnection: close\r\n\r\n")
+    assert status == 200
+    assert payload["queue_depth"] == 0
+    assert set(payload["latency_ms"]) == {"p50", "p90", "p99", "max"}